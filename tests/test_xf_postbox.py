@@ -0,0 +1,377 @@
+import os
+from threading import Event
+
+import pytest
+
+import xf_postbox
+from xf_postbox import ConfigError
+
+FILE_TYPES = {
+    'full_files': True,
+    'change_files': True,
+    'flag_files': True,
+    'config_files': True,
+}
+
+
+def make_config(tmp_path, *names, **extra):
+  """계정별 destination이 tmp_path 아래인 설정 생성"""
+  config = {
+      'connections': [{
+          'name': name,
+          'host': 'host',
+          'username': name,
+          'password': 'pw',
+          'destination': str(tmp_path / name),
+      } for name in names],
+      'download': {'thread_count': 2, 'file_types': dict(FILE_TYPES)},
+      'directories': ['Products', 'Xpressfeed'],
+  }
+  config.update(extra)
+  return config
+
+
+def make_file(account, filename, size_bytes, package='PkgA'):
+  return {
+      'account': account,
+      'directory': 'Products',
+      'package': package,
+      'filename': filename,
+      'size_bytes': size_bytes,
+      'size_readable': '',
+  }
+
+
+class FakeRemoteFile:
+  """sftp.open()이 반환하는 원격 파일 - read 요청 크기 기록"""
+
+  def __init__(self, data, reads):
+    self.data = data
+    self.reads = reads
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    return False
+
+  def read(self, size):
+    self.reads.append(size)
+    data, self.data = self.data[:size], self.data[size:]
+    return data
+
+
+class FakeSFTP:
+  """getfo/open만 흉내내는 SFTP - fail_files에 있으면 예외 발생
+
+  calls에 ('getfo' | 'open', 파일 이름)을 기록합니다.
+  """
+
+  def __init__(self, fail_files=(), calls=None, data=b'data'):
+    self.fail_files = fail_files
+    self.calls = calls if calls is not None else []
+    self.data = data
+    self.reads = []
+
+  def chdir(self, path):
+    pass
+
+  def getfo(self, file_name, fo, callback=None):
+    self.calls.append(('getfo', file_name))
+    if file_name in self.fail_files:
+      raise IOError('permission denied')
+    fo.write(self.data)
+    if callback:
+      callback(len(self.data), len(self.data))
+
+  def open(self, file_name, mode='r'):
+    self.calls.append(('open', file_name))
+    if file_name in self.fail_files:
+      raise IOError('permission denied')
+    return FakeRemoteFile(self.data, self.reads)
+
+  def close(self):
+    pass
+
+
+class FakeTransport:
+  def close(self):
+    pass
+
+
+# filter_full_files / filter_change_files
+
+def test_filter_full_files_keeps_latest_timestamp():
+  files = ['A_Full_20241101_1.zip', 'A_Full_20241117_1.zip',
+           'A_Full_20241117_2.zip']
+  assert xf_postbox.filter_full_files(files) == [
+      'A_Full_20241117_1.zip', 'A_Full_20241117_2.zip']
+
+
+def test_filter_full_files_empty_or_without_timestamp():
+  assert xf_postbox.filter_full_files([]) == []
+  assert xf_postbox.filter_full_files(['A_Full.zip']) == []
+
+
+def test_filter_change_files_on_or_after_full_date():
+  changes = ['A_Change_20241116.zip', 'A_Change_20241117.zip',
+             'A_Change_20241118.zip', 'A_Change.zip']
+  assert xf_postbox.filter_change_files('A_Full_20241117.zip', changes) == [
+      'A_Change_20241117.zip', 'A_Change_20241118.zip']
+
+
+# get_connections
+
+def test_get_connections_single_connection_block(tmp_path):
+  config = make_config(tmp_path, 'a', packages={'products': ['PkgA']})
+  config['connection'] = config.pop('connections')[0]
+  del config['connection']['name']
+
+  connections = xf_postbox.get_connections(config)
+  assert len(connections) == 1
+  assert connections[0]['name'] == 'a@host'
+  assert connections[0]['packages'] == {'products': ['PkgA']}
+
+
+def test_get_connections_packages_override(tmp_path):
+  config = make_config(tmp_path, 'a', 'b', packages={'products': ['PkgA']})
+  config['connections'][1]['packages'] = {}
+
+  a, b = xf_postbox.get_connections(config)
+  assert a['packages'] == {'products': ['PkgA']}
+  assert b['packages'] == {}
+
+
+def test_get_connections_duplicate_name(tmp_path):
+  config = make_config(tmp_path, 'a', 'a')
+  with pytest.raises(ConfigError):
+    xf_postbox.get_connections(config)
+
+
+@pytest.mark.parametrize('mutate', [
+    lambda config: None,
+    lambda config: [],
+    lambda config: dict(config, connections=['not-a-mapping']),
+    lambda config: dict(config, connections={'name': 'a'}),
+    lambda config: {k: v for k, v in config.items() if k != 'download'},
+    lambda config: dict(config, download={'thread_count': 2}),
+    lambda config: dict(config, download={'file_types': {'full_files': True}}),
+    lambda config: dict(config, directories='Products'),
+    lambda config: dict(config, packages={'products': 'PkgA'}),
+])
+def test_get_connections_malformed_config(tmp_path, mutate):
+  config = mutate(make_config(tmp_path, 'a'))
+  with pytest.raises(ConfigError):
+    xf_postbox.get_connections(config)
+
+
+def test_get_connections_missing_connection_field(tmp_path):
+  config = make_config(tmp_path, 'a')
+  del config['connections'][0]['password']
+  with pytest.raises(ConfigError):
+    xf_postbox.get_connections(config)
+
+
+# plan
+
+def test_plan_skips_same_size_and_creates_directories(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a')
+  pkg_dir = tmp_path / 'a' / 'Products' / 'PkgA'
+  pkg_dir.mkdir(parents=True)
+  (pkg_dir / 'same.zip').write_bytes(b'1234')
+  (pkg_dir / 'partial.zip').write_bytes(b'12')
+
+  monkeypatch.chdir(tmp_path)
+  cwd = os.getcwd()
+
+  files = [make_file('a', 'same.zip', 4), make_file('a', 'partial.zip', 4),
+           make_file('a', 'new.zip', 4), make_file('a', 'unknown.zip', None)]
+  pending, skipped = xf_postbox.plan(config, files)
+
+  assert [f['filename'] for f in skipped] == ['same.zip']
+  assert [f['filename'] for f in pending] == [
+      'partial.zip', 'new.zip', 'unknown.zip']
+  assert (tmp_path / 'a' / 'Xpressfeed').is_dir()
+  assert os.getcwd() == cwd
+
+
+def test_plan_shared_destination_downloads_once(tmp_path):
+  config = make_config(tmp_path, 'a', 'b')
+  config['connections'][1]['destination'] = str(tmp_path / 'a') + os.sep
+
+  files = [make_file('a', 'setup.zip', 4, package='V5Loader_Linux'),
+           make_file('b', 'setup.zip', 4, package='V5Loader_Linux')]
+  pending, skipped = xf_postbox.plan(config, files)
+
+  assert len(pending) == 1
+  assert skipped == []
+
+
+def test_dedupe_files_matches_plan_for_dry_run(tmp_path):
+  config = make_config(tmp_path, 'a', 'b', 'c')
+  config['connections'][1]['destination'] = str(tmp_path / 'a')
+
+  files = [make_file('a', 'setup.zip', 4, package='V5Loader_Linux'),
+           make_file('b', 'setup.zip', 4, package='V5Loader_Linux'),
+           make_file('c', 'setup.zip', 4, package='V5Loader_Linux'),
+           make_file('b', 'only_b.zip', 4)]
+  unique = xf_postbox.dedupe_files(config, files)
+
+  assert [(f['account'], f['filename']) for f in unique] == [
+      ('a', 'setup.zip'), ('c', 'setup.zip'), ('b', 'only_b.zip')]
+  assert not (tmp_path / 'a').exists()
+
+  pending, skipped = xf_postbox.plan(config, files)
+  assert pending + skipped == unique
+
+
+# summarize
+
+def test_summarize_counts_per_account():
+  results = [dict(make_file('a', 'x.zip', 1), status='downloaded'),
+             dict(make_file('a', 'y.zip', 1), status='failed'),
+             dict(make_file('b', 'z.zip', 1), status='interrupted')]
+  skipped = [make_file('b', 'w.zip', 1)]
+
+  assert xf_postbox.summarize(results, skipped) == {
+      'a': {'downloaded': 1, 'skipped': 0, 'interrupted': 0, 'failed': 1},
+      'b': {'downloaded': 0, 'skipped': 1, 'interrupted': 1, 'failed': 0},
+  }
+
+
+# download_all
+
+def test_download_all_statuses(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a', 'b')
+  monkeypatch.setattr(
+      xf_postbox, 'connect',
+      lambda host, username, password: (FakeSFTP(['bad.zip']), FakeTransport()))
+
+  files = [make_file('a', 'ok.zip', 4), make_file('b', 'bad.zip', 4)]
+  pending, _ = xf_postbox.plan(config, files)
+
+  done = []
+  results = xf_postbox.download_all(
+      config, pending, on_done=lambda f, status: done.append(status))
+
+  assert {r['filename']: r['status'] for r in results} == {
+      'ok.zip': 'downloaded', 'bad.zip': 'failed'}
+  assert sorted(done) == ['downloaded', 'failed']
+  assert (tmp_path / 'a' / 'Products' / 'PkgA' / 'ok.zip').read_bytes() == b'data'
+
+
+def test_download_all_connect_error_is_failed(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a')
+
+  def connect(host, username, password):
+    raise OSError('connection refused')
+
+  monkeypatch.setattr(xf_postbox, 'connect', connect)
+  results = xf_postbox.download_all(config, [make_file('a', 'ok.zip', 4)])
+  assert results[0]['status'] == 'failed'
+
+
+def test_download_all_stop_event_interrupts(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a')
+  monkeypatch.setattr(
+      xf_postbox, 'connect',
+      lambda host, username, password: pytest.fail('connect after stop'))
+
+  stop_event = Event()
+  stop_event.set()
+  results = xf_postbox.download_all(
+      config, [make_file('a', 'ok.zip', 4)], stop_event=stop_event)
+  assert results[0]['status'] == 'interrupted'
+
+
+def test_download_all_bandwidth_limit_uses_throttled_reads(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a')
+  config['download']['bandwidth_limit'] = 1
+  data = b'x' * (xf_postbox.READ_BLOCK_SIZE * 2 + 10)
+  calls = []
+  monkeypatch.setattr(
+      xf_postbox, 'connect',
+      lambda host, username, password: (FakeSFTP(calls=calls, data=data),
+                                        FakeTransport()))
+  consumed = []
+  monkeypatch.setattr(xf_postbox.BandwidthLimiter, 'consume',
+                      lambda self, nbytes: consumed.append(nbytes))
+
+  progress = []
+  files = [make_file('a', 'big.zip', len(data))]
+  pending, _ = xf_postbox.plan(config, files)
+  results = xf_postbox.download_all(
+      config, pending,
+      on_progress=lambda f, transferred, total: progress.append(transferred))
+
+  assert results[0]['status'] == 'downloaded'
+  assert calls == [('open', 'big.zip')]
+  # read 요청마다 먼저 limiter에서 대기 (마지막 빈 read 포함)
+  assert consumed == [xf_postbox.READ_BLOCK_SIZE] * 4
+  assert progress[-1] == len(data)
+  assert (tmp_path / 'a' / 'Products' / 'PkgA' / 'big.zip').read_bytes() == data
+
+
+def test_download_all_without_limit_uses_getfo(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a')
+  calls = []
+  monkeypatch.setattr(
+      xf_postbox, 'connect',
+      lambda host, username, password: (FakeSFTP(calls=calls), FakeTransport()))
+
+  pending, _ = xf_postbox.plan(config, [make_file('a', 'ok.zip', 4)])
+  results = xf_postbox.download_all(config, pending)
+  assert results[0]['status'] == 'downloaded'
+  assert calls == [('getfo', 'ok.zip')]
+
+
+def test_interleave_accounts_round_robin():
+  files = [make_file('a', 'a1', 1), make_file('a', 'a2', 1),
+           make_file('a', 'a3', 1), make_file('b', 'b1', 1),
+           make_file('c', 'c1', 1), make_file('c', 'c2', 1)]
+  assert [f['filename'] for f in xf_postbox.interleave_accounts(files)] == [
+      'a1', 'b1', 'c1', 'a2', 'c2', 'a3']
+  assert xf_postbox.interleave_accounts([]) == []
+
+
+def test_download_all_feeds_threads_one_file_at_a_time(tmp_path, monkeypatch):
+  config = make_config(tmp_path, 'a', 'b')
+  order = []
+
+  def download(file_info, conn, limiter=None, stop_event=None, on_progress=None):
+    order.append(file_info['filename'])
+    return 'downloaded'
+
+  monkeypatch.setattr(xf_postbox, 'download', download)
+  config['download']['thread_count'] = 1
+  files = [make_file('a', f'a{i}', 1) for i in range(3)] + [
+      make_file('b', f'b{i}', 1) for i in range(3)]
+
+  results = xf_postbox.download_all(config, files)
+  assert order == ['a0', 'b0', 'a1', 'b1', 'a2', 'b2']
+  assert len(results) == 6
+
+
+# BandwidthLimiter
+
+def test_bandwidth_limiter_reserves_time_across_calls(monkeypatch):
+  clock = [100.0]
+  sleeps = []
+
+  def sleep(seconds):
+    sleeps.append(seconds)
+    clock[0] += seconds
+
+  monkeypatch.setattr(xf_postbox.time, 'monotonic', lambda: clock[0])
+  monkeypatch.setattr(xf_postbox.time, 'sleep', sleep)
+
+  limiter = xf_postbox.BandwidthLimiter(1000)
+  limiter.consume(500)
+  limiter.consume(500)
+  assert sleeps == [0.5, 0.5]
+  assert clock[0] == 101.0
+
+  # 유휴 시간은 적립되지 않음 - 쉬었다가 다시 요청해도 같은 속도
+  clock[0] += 10
+  limiter.consume(250)
+  assert sleeps[-1] == 0.25
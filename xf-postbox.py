@@ -1,509 +1,198 @@
-from paramiko import Transport, SFTPClient
 import os
-import re
-import yaml
-import signal
 import sys
+import signal
+import logging
 import argparse
-import csv
-from datetime import datetime
-from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn, DownloadColumn, TransferSpeedColumn
-from rich.console import Console
-from rich.prompt import Confirm
-from rich.table import Table
-from multiprocessing.pool import ThreadPool
 from threading import Lock, Event
 
-console = Console()
+import xf_postbox
+from xf_postbox import format_size
+
+console = None  # Rich Console - headless 모드에서는 Rich를 로드하지 않음
 progress_lock = Lock()
 shutdown_event = Event()
 
+# headless 모드에서 Rich 스타일을 로그 레벨로 변환
+STYLE_LEVELS = {'red': logging.ERROR, 'bold red': logging.ERROR,
+                'yellow': logging.WARNING}
+
+
+class ConsoleHandler(logging.Handler):
+  """xf_postbox 로그를 Rich Console로 출력"""
+  STYLES = {logging.WARNING: 'yellow', logging.ERROR: 'red'}
+
+  def emit(self, record):
+    console.print(self.format(record), style=self.STYLES.get(record.levelno),
+                  markup=False, highlight=False)
+
+
+def setup_output(headless):
+  """출력 설정 - headless면 표준 logging, 아니면 Rich Console"""
+  global console
+  if headless:
+    # 루트는 WARNING 유지 - 파일마다 연결하는 paramiko의 INFO 로그 제외
+    logging.basicConfig(
+        level=logging.WARNING, format='%(asctime)s %(levelname)s %(message)s')
+    xf_postbox.log.setLevel(logging.INFO)
+    return
+
+  from rich.console import Console
+
+  console = Console()
+  xf_postbox.log.addHandler(ConsoleHandler())
+  xf_postbox.log.setLevel(logging.INFO)
+  xf_postbox.log.propagate = False
+
+
+def echo(message, style=None):
+  """메시지 출력 - Rich Console 또는 로그"""
+  if console is not None:
+    console.print(message, style=style, markup=False, highlight=False)
+  else:
+    xf_postbox.log.log(STYLE_LEVELS.get(style, logging.INFO), message.strip())
+
 
 def signal_handler(sig, frame):
   """Ctrl+C 처리 - Graceful Shutdown"""
   if shutdown_event.is_set():
     # 두 번째 Ctrl+C - 강제 종료
-    console.print("\n[bold red]✗ 강제 종료합니다...[/bold red]")
+    echo("\n✗ 강제 종료합니다...", "bold red")
     os._exit(1)
   else:
     # 첫 번째 Ctrl+C
-    console.print("\n[yellow]⚠ 종료 신호 감지... 진행 중인 다운로드를 완료하고 종료합니다.[/yellow]")
-    console.print("[yellow]즉시 강제 종료하려면 Ctrl+C를 한 번 더 누르세요.[/yellow]")
+    echo("\n⚠ 종료 신호 감지... 진행 중인 다운로드를 완료하고 종료합니다.", "yellow")
+    echo("즉시 강제 종료하려면 Ctrl+C를 한 번 더 누르세요.", "yellow")
     shutdown_event.set()
 
 
-def load_config(config_path='config.yaml'):
-  """설정 파일 로드"""
-  try:
-    with open(config_path, 'r', encoding='utf-8') as f:
-      return yaml.safe_load(f)
-  except FileNotFoundError:
-    console.print(f"[red]설정 파일을 찾을 수 없습니다: {config_path}[/red]")
-    console.print("[yellow]config.yaml 파일을 생성해주세요.[/yellow]")
-    exit(1)
-  except yaml.YAMLError as e:
-    console.print(f"[red]설정 파일 파싱 오류: {e}[/red]")
-    exit(1)
-
-
-def connect(host, username, password):
-  """SFTP 연결 (타임아웃 설정)"""
-  transport = Transport((host, 22))
-  transport.connect(username=username, password=password)
-  transport.set_keepalive(30)
-  sftp = SFTPClient.from_transport(transport)
-  sftp.get_channel().settimeout(30.0)
-  return sftp, transport
-
-
-def filter_full_files(full_files):
-  """최신 Full 파일들 필터링 - 같은 타임스탬프의 파일들만"""
-  if not full_files:
-    return []
-
-  full_files.sort()
-  last_full_file = full_files[-1]
-  m = re.search('[0-9]{8,}', last_full_file)
-  if not m:
-    return []
-
-  timestamp = m.group(0)
-  return list(filter(lambda t: timestamp in t, full_files))
-
-
-def filter_change_files(last_full_file, change_files):
-  """Full 파일 날짜 이후의 Change 파일들 필터링 - 날짜(앞 8자리) 기준"""
-  m = re.search('[0-9]{8,}', last_full_file)
-  if not m:
-    return []
-
-  timestamp = m.group(0)
-  cf_timestamps = []
-
-  for t in change_files:
-    m2 = re.search('[0-9]{' + str(len(timestamp)) + '}', t)
-    if m2:
-      cf_timestamps.append(m2.group(0))
-    else:
-      cf_timestamps.append("")
-
-  filter_lst = [t[:8] >= timestamp[:8] if len(
-      t) >= 8 else False for t in cf_timestamps]
-  return [change_files[i] for i in range(len(change_files)) if filter_lst[i]]
-
-
-def format_size(size_bytes):
-  """바이트를 읽기 쉬운 형식으로 변환"""
-  for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-    if size_bytes < 1024.0:
-      return f"{size_bytes:.2f} {unit}"
-    size_bytes /= 1024.0
-  return f"{size_bytes:.2f} PB"
-
-
-def save_estimate_csv(download_files_with_size):
-  """파일 정보를 CSV로 저장"""
-  timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-  csv_filename = f'download_estimate_{timestamp}.csv'
-
-  total_size = sum([info['size_bytes'] for info in download_files_with_size])
-
-  with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
-    fieldnames = ['directory', 'package',
-                  'filename', 'size_bytes', 'size_readable']
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-    writer.writeheader()
-    for file_info in download_files_with_size:
-      writer.writerow(file_info)
-
-    # 마지막에 총합 추가
-    writer.writerow({
-        'directory': '',
-        'package': '',
-        'filename': 'TOTAL',
-        'size_bytes': total_size,
-        'size_readable': format_size(total_size)
-    })
-
-  # 터미널에 요약 테이블 표시
-  table = Table(title="다운로드 예상 크기 요약")
-  table.add_column("항목", style="cyan")
-  table.add_column("값", style="green")
-
-  table.add_row("총 파일 수", str(len(download_files_with_size)))
-  table.add_row("총 크기", format_size(total_size))
-  table.add_row("총 크기 (GB)", f"{total_size / (1024**3):.2f} GB")
-  table.add_row("CSV 파일", csv_filename)
-
-  console.print()
-  console.print(table)
-  console.print(f"\n[green]✓ 상세 내역이 {csv_filename}에 저장되었습니다.[/green]")
-
-
-def download(file_dic, config, progress=None, overall_task_id=None):
-  """파일 다운로드"""
-  if shutdown_event.is_set():
-    if progress and overall_task_id is not None:
-      with progress_lock:
-        progress.update(overall_task_id, advance=1)
-    return
+def print_estimate(files, csv_filename):
+  """Dry-run 예상 크기 요약 출력"""
+  total_size = sum([info['size_bytes'] or 0 for info in files])
+  rows = [
+      ("계정 수", str(len(set(info['account'] for info in files)))),
+      ("총 파일 수", str(len(files))),
+      ("총 크기", format_size(total_size)),
+      ("총 크기 (GB)", f"{total_size / (1024**3):.2f} GB"),
+      ("CSV 파일", csv_filename),
+  ]
+
+  if console is None:
+    for name, value in rows:
+      echo(f"{name}: {value}")
+  else:
+    from rich.table import Table
 
-  file_task_id = None
-  sftp = None
-  transport = None
+    # 터미널에 요약 테이블 표시
+    table = Table(title="다운로드 예상 크기 요약")
+    table.add_column("항목", style="cyan")
+    table.add_column("값", style="green")
+    for row in rows:
+      table.add_row(*row)
 
-  try:
-    conn = config['connection']
-    host = conn['host']
-    username = conn['username']
-    password = conn['password']
+    console.print()
+    console.print(table)
 
-    sftp, transport = connect(host, username, password)
-    top_dir, package, file_name = file_dic
+  echo(f"\n✓ 상세 내역이 {csv_filename}에 저장되었습니다.", "green")
 
-    sftp.chdir(top_dir)
-    sftp.chdir(package)
 
-    f = os.path.join(top_dir, package, file_name)
+def print_report(connections, summary, scan_errors):
+  """계정별 다운로드 결과 요약 출력"""
+  statuses = ['downloaded', 'skipped', 'interrupted', 'failed']
 
-    size = sftp.stat(file_name).st_size
+  if console is None:
+    for conn in connections:
+      if conn['name'] in scan_errors:
+        echo(f"{conn['name']}: 스캔 실패", "red")
+        continue
+      counts = summary.get(conn['name'], {})
+      echo(f"{conn['name']}: " +
+           ", ".join(f"{s}={counts.get(s, 0)}" for s in statuses))
+    return
 
-    if os.path.isfile(f) and size == os.path.getsize(f):
-      console.print(f"[yellow]✓ {file_name} 이미 다운로드됨[/yellow]")
-      sftp.close()
-      transport.close()
-      if progress and overall_task_id is not None:
-        with progress_lock:
-          progress.update(overall_task_id, advance=1)
-      return
+  from rich.table import Table
 
-    if progress:
-      with progress_lock:
-        file_task_id = progress.add_task(
-            f"[green]  ↳ {file_name[:50]}...",
-            total=size
-        )
+  table = Table(title="다운로드 결과 요약")
+  table.add_column("계정", style="cyan")
+  table.add_column("다운로드", style="green", justify="right")
+  table.add_column("건너뜀", style="yellow", justify="right")
+  table.add_column("중단", style="yellow", justify="right")
+  table.add_column("실패", style="red", justify="right")
 
-    with open(f, 'wb') as ff:
-      def _callback(transferred, total):
-        if shutdown_event.is_set():
-          raise KeyboardInterrupt("Download interrupted by user")
+  for conn in connections:
+    if conn['name'] in scan_errors:
+      table.add_row(conn['name'], "-", "-", "-", "스캔 실패")
+      continue
+    counts = summary.get(conn['name'], {})
+    table.add_row(conn['name'], *[str(counts.get(s, 0)) for s in statuses])
 
-        if progress and file_task_id is not None:
-          with progress_lock:
-            progress.update(file_task_id, completed=transferred)
+  console.print()
+  console.print(table)
 
-      sftp.getfo(file_name, ff, callback=_callback)
 
-    if progress and file_task_id is not None:
-      with progress_lock:
-        progress.update(file_task_id, visible=False)
+def run_downloads(config, connections, pending):
+  """다운로드 실행 - Rich 모드면 진행률 표시"""
+  if console is None:
+    return xf_postbox.download_all(
+        config, pending, connections, stop_event=shutdown_event)
 
-    console.print(f"[green]✓ {file_name} 다운로드 완료[/green]")
+  from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn, DownloadColumn, TransferSpeedColumn
 
-    if progress and overall_task_id is not None:
-      with progress_lock:
-        progress.update(overall_task_id, advance=1)
+  with Progress(
+      SpinnerColumn(),
+      TextColumn("[bold blue]{task.description}"),
+      BarColumn(complete_style="green", finished_style="bold green"),
+      DownloadColumn(),
+      TransferSpeedColumn(),
+      TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+      TimeRemainingColumn(),
+      console=console,
+      transient=False,
+      expand=True
+  ) as progress:
 
-  except KeyboardInterrupt:
-    console.print(f"[yellow]⚠ {file_name} 다운로드 중단됨[/yellow]")
+    overall_task = progress.add_task(
+        f"[cyan]전체 진행률 (0/{len(pending)} files)",
+        total=len(pending)
+    )
+    file_tasks = {}
 
-    if progress and file_task_id is not None:
-      with progress_lock:
-        progress.update(file_task_id, visible=False)
+    def _key(file_info):
+      return (file_info['account'], file_info['directory'],
+              file_info['package'], file_info['filename'])
 
-    if progress and overall_task_id is not None:
+    def on_start(file_info):
       with progress_lock:
-        progress.update(overall_task_id, advance=1)
-
-  except Exception as e:
-    console.print(f'[red]✗ 오류 발생 ({file_name}): {e}[/red]')
+        file_tasks[_key(file_info)] = progress.add_task(
+            f"[green]  ↳ {file_info['account']}: {file_info['filename'][:50]}...",
+            total=file_info['size_bytes']
+        )
 
-    if progress and file_task_id is not None:
+    def on_progress(file_info, transferred, total):
       with progress_lock:
-        progress.update(file_task_id, visible=False)
+        progress.update(file_tasks[_key(file_info)], completed=transferred)
 
-    if progress and overall_task_id is not None:
+    def on_done(file_info, status):
       with progress_lock:
-        progress.update(overall_task_id, advance=1)
+        file_task_id = file_tasks.pop(_key(file_info), None)
+        if file_task_id is not None:
+          progress.update(file_task_id, visible=False)
+        progress.update(overall_task, advance=1)
+        completed = progress.tasks[overall_task].completed
+        progress.update(
+            overall_task,
+            description=f"[cyan]전체 진행률 ({int(completed)}/{len(pending)} files)"
+        )
 
-  finally:
     try:
-      if sftp:
-        sftp.close()
-      if transport:
-        transport.close()
-    except:
-      pass
-
-
-def scan_packages(sftp, top_dir, allowed_packages, config, get_sizes=False):
-  """패키지 스캔 및 다운로드 파일 목록 생성"""
-  download_files = []
-  download_files_with_size = []
-  packages = sftp.listdir()
-
-  file_types = config['download']['file_types']
-
-  if allowed_packages is None:
-    allowed_packages = []
-
-  for package in packages:
-    if allowed_packages and package not in allowed_packages:
-      continue
-
-    sftp.chdir(package)
-    console.print(f'  → {os.path.join(top_dir, package)}')
-
-    # dry-run이 아닐 때만 로컬 폴더 생성
-    if not get_sizes:
-      p = os.path.join(top_dir, package)
-      if not os.path.exists(p):
-        os.makedirs(p)
-
-    files = sftp.listdir()
-
-    # Feed Config 다운로드
-    if package == 'XpressfeedFeedConfigV2' and file_types['config_files']:
-      files.sort()
-      if files:
-        file_name = files[-1]
-        download_files.append((top_dir, package, file_name))
-        if get_sizes:
-          try:
-            size = sftp.stat(file_name).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': file_name,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-      sftp.chdir('..')
-      continue
-
-    # 설치 파일 다운로드
-    if package in ['V5Loader_Linux', 'V5Loader_Windows']:
-      for f in files:
-        download_files.append((top_dir, package, f))
-        if get_sizes:
-          try:
-            size = sftp.stat(f).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': f,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-      sftp.chdir('..')
-      continue
-
-    # Full flag 파일
-    if file_types['flag_files']:
-      full_flags = [f for f in files if "Full" in f and f.endswith("flg")]
-      if full_flags:
-        full_flags.sort()
-        last_full_flag = full_flags[-1]
-        download_files.append((top_dir, package, last_full_flag))
-        if get_sizes:
-          try:
-            size = sftp.stat(last_full_flag).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': last_full_flag,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-      else:
-        console.print(f"    [dim]⚠ Full flags 없음[/dim]")
-
-    # Full 파일
-    valid_fulls = []
-    if file_types['full_files']:
-      full_files = [f for f in files if "Full" in f and f.endswith("zip")]
-      valid_fulls = filter_full_files(full_files)
-      if valid_fulls:
-        console.print(f"    [cyan]→ Full 파일 {len(valid_fulls)}개 발견[/cyan]")
-      for vf in valid_fulls:
-        download_files.append((top_dir, package, vf))
-        if get_sizes:
-          try:
-            size = sftp.stat(vf).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': vf,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-
-    # Change 파일
-    if file_types['change_files'] and valid_fulls:
-      change_files = [f for f in files if "Change" in f and f.endswith("zip")]
-      if change_files:
-        valid_changes = filter_change_files(valid_fulls[-1], change_files)
-        if valid_changes:
-          console.print(
-              f"    [cyan]→ Change 파일 {len(valid_changes)}개 발견[/cyan]")
-        for vc in valid_changes:
-          download_files.append((top_dir, package, vc))
-          if get_sizes:
-            try:
-              size = sftp.stat(vc).st_size
-              download_files_with_size.append({
-                  'directory': top_dir,
-                  'package': package,
-                  'filename': vc,
-                  'size_bytes': size,
-                  'size_readable': format_size(size)
-              })
-            except:
-              pass
-      else:
-        console.print(f"    [dim]⚠ Change files 없음[/dim]")
-
-    sftp.chdir('..')
-
-  if get_sizes:
-    return download_files, download_files_with_size
-  return download_files, []
-
-
-def scan_xpressfeed_packages(sftp, top_dir, allowed_packages, config, get_sizes=False):
-  """Xpressfeed 패키지 스캔"""
-  download_files = []
-  download_files_with_size = []
-  packages = sftp.listdir()
-
-  file_types = config['download']['file_types']
-
-  if allowed_packages is None:
-    allowed_packages = []
-
-  for package in packages:
-    if allowed_packages and package not in allowed_packages:
-      continue
-
-    sftp.chdir(package)
-    console.print(f'  → {os.path.join(top_dir, package)}')
-
-    # dry-run이 아닐 때만 로컬 폴더 생성
-    if not get_sizes:
-      p = os.path.join(top_dir, package)
-      if not os.path.exists(p):
-        os.makedirs(p)
-
-    files = sftp.listdir()
-
-    if package in ['suppcxf']:
-      for lf in files:
-        download_files.append((top_dir, package, lf))
-        if get_sizes:
-          try:
-            size = sftp.stat(lf).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': lf,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-      sftp.chdir('..')
-      continue
-
-    # Full flag 파일
-    if file_types['flag_files']:
-      full_flags = [f for f in files if f.startswith(
-          "f_") and f.endswith("flg")]
-      if full_flags:
-        full_flags.sort()
-        last_full_flag = full_flags[-1]
-        download_files.append((top_dir, package, last_full_flag))
-        if get_sizes:
-          try:
-            size = sftp.stat(last_full_flag).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': last_full_flag,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-      else:
-        console.print(f"    [dim]⚠ Full flags 없음[/dim]")
-
-    # Full 파일
-    valid_fulls = []
-    if file_types['full_files']:
-      full_files = [f for f in files if f.startswith(
-          "f_") and f.endswith("zip")]
-      valid_fulls = filter_full_files(full_files)
-      if valid_fulls:
-        console.print(f"    [cyan]→ Full 파일 {len(valid_fulls)}개 발견[/cyan]")
-      for vf in valid_fulls:
-        download_files.append((top_dir, package, vf))
-        if get_sizes:
-          try:
-            size = sftp.stat(vf).st_size
-            download_files_with_size.append({
-                'directory': top_dir,
-                'package': package,
-                'filename': vf,
-                'size_bytes': size,
-                'size_readable': format_size(size)
-            })
-          except:
-            pass
-
-    # Change 파일
-    if file_types['change_files'] and valid_fulls:
-      change_files = [f for f in files if f.startswith("t_")]
-      if change_files:
-        valid_changes = filter_change_files(valid_fulls[-1], change_files)
-        if valid_changes:
-          console.print(
-              f"    [cyan]→ Change 파일 {len(valid_changes)}개 발견[/cyan]")
-        for vc in valid_changes:
-          download_files.append((top_dir, package, vc))
-          if get_sizes:
-            try:
-              size = sftp.stat(vc).st_size
-              download_files_with_size.append({
-                  'directory': top_dir,
-                  'package': package,
-                  'filename': vc,
-                  'size_bytes': size,
-                  'size_readable': format_size(size)
-              })
-            except:
-              pass
-      else:
-        console.print(f"    [dim]⚠ Change files 없음[/dim]")
-
-    sftp.chdir('..')
-
-  if get_sizes:
-    return download_files, download_files_with_size
-  return download_files, []
+      return xf_postbox.download_all(
+          config, pending, connections, stop_event=shutdown_event,
+          on_start=on_start, on_progress=on_progress, on_done=on_done)
+    finally:
+      echo("스레드 정리 완료", "dim")
 
 
 def main():
-  """메인 함수"""
+  """메인 함수 - 종료 코드 반환 (실패/중단 시 1)"""
   parser = argparse.ArgumentParser(
       description='S&P Global Xpressfeed Downloader',
       formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -511,6 +200,8 @@ def main():
 예제:
   python xf-postbox.py                # 일반 다운로드
   python xf-postbox.py --dry-run      # 크기만 확인 (CSV 저장)
+  python xf-postbox.py --yes          # 확인 없이 다운로드
+  python xf-postbox.py --headless     # cron 등 비대화형 실행 (Rich 미사용)
         """
   )
   parser.add_argument(
@@ -518,165 +209,101 @@ def main():
       action='store_true',
       help='파일 크기만 확인하고 다운로드는 하지 않음 (CSV로 저장)'
   )
+  parser.add_argument(
+      '-y', '--yes',
+      action='store_true',
+      help='다운로드 확인 없이 바로 진행'
+  )
+  parser.add_argument(
+      '--headless',
+      action='store_true',
+      help='Rich UI 없이 로그만 출력 (--yes 포함)'
+  )
+  parser.add_argument(
+      '-c', '--config',
+      default='config.yaml',
+      help='설정 파일 경로 (기본값: config.yaml)'
+  )
   args = parser.parse_args()
 
+  setup_output(args.headless)
   signal.signal(signal.SIGINT, signal_handler)
 
-  console.print("[bold blue]S&P Global Xpressfeed Downloader[/bold blue]")
-  console.print("=" * 50)
+  echo("S&P Global Xpressfeed Downloader", "bold blue")
+  if console is not None:
+    echo("=" * 50)
 
   if args.dry_run:
-    console.print("[yellow]⚠ Dry-run 모드 활성화[/yellow]")
-
-  config = load_config()
-  console.print("[green]✓ 설정 파일 로드 완료[/green]")
+    echo("⚠ Dry-run 모드 활성화", "yellow")
 
   try:
-    conn = config['connection']
-    host = conn['host']
-    username = conn['username']
-    password = conn['password']
-    destination = conn['destination']
-
-    if not all([host, username, password, destination]):
-      console.print("[red]config.yaml의 connection 설정을 확인하세요[/red]")
-      exit(1)
-
-  except KeyError as e:
-    console.print(f"[red]config.yaml에 필수 항목이 없습니다: {e}[/red]")
-    exit(1)
-
-  # 로컬 디렉토리 설정 (dry-run이 아닐 때만)
-  if not args.dry_run:
-    if not os.path.exists(destination):
-      os.makedirs(destination)
-      console.print(f"[cyan]대상 디렉토리 생성: {destination}[/cyan]")
-
-    os.chdir(destination)
-    for dir_name in config['directories']:
-      if not os.path.exists(dir_name):
-        os.mkdir(dir_name)
-        console.print(f"[cyan]하위 디렉토리 생성: {dir_name}[/cyan]")
-
-  # SFTP 연결
-  console.print(f"\n[cyan]SFTP 서버 연결 중... ({host})[/cyan]")
-  try:
-    sftp, transport = connect(host, username, password)
-    console.print("[green]✓ SFTP 연결 성공[/green]\n")
-  except Exception as e:
-    console.print(f"[red]✗ SFTP 연결 실패: {e}[/red]")
-    exit(1)
-
-  download_files = []
-  download_files_with_size = []
-
-  # Products 디렉토리 스캔
-  if 'Products' in sftp.listdir('.'):
-    sftp.chdir('Products')
-    console.print('[bold]Products 디렉토리 스캔 중...[/bold]')
-    products_files, products_sizes = scan_packages(
-        sftp, 'Products',
-        config['packages'].get('products', []),
-        config,
-        get_sizes=args.dry_run
-    )
-    download_files.extend(products_files)
-    download_files_with_size.extend(products_sizes)
-    console.print(f"[cyan]→ Products에서 {len(products_files)}개 파일 발견[/cyan]")
-    sftp.chdir('..')
-
-  # Xpressfeed 디렉토리 스캔
-  if 'Xpressfeed' in sftp.listdir('.'):
-    sftp.chdir('Xpressfeed')
-    console.print('\n[bold]Xpressfeed 디렉토리 스캔 중...[/bold]')
-    xpressfeed_files, xpressfeed_sizes = scan_xpressfeed_packages(
-        sftp, 'Xpressfeed',
-        config['packages'].get('xpressfeed', []),
-        config,
-        get_sizes=args.dry_run
-    )
-    download_files.extend(xpressfeed_files)
-    download_files_with_size.extend(xpressfeed_sizes)
-    console.print(
-        f"[cyan]→ Xpressfeed에서 {len(xpressfeed_files)}개 파일 발견[/cyan]")
-    sftp.chdir('..')
-
-  sftp.close()
-  transport.close()
+    config = xf_postbox.load_config(args.config)
+    connections = xf_postbox.get_connections(config)
+  except xf_postbox.ConfigError as e:
+    echo(str(e), "red")
+    return 1
 
-  console.print(
-      f"\n[bold green]파일 스캔 완료: 총 {len(download_files)}개 파일 발견[/bold green]\n")
+  echo("✓ 설정 파일 로드 완료", "green")
+  echo(f"✓ 계정 {len(connections)}개 설정됨", "green")
 
-  if not download_files:
-    console.print("[yellow]다운로드할 파일이 없습니다.[/yellow]")
-    return
+  # 계정별 SFTP 스캔 (동시 실행)
+  echo(f"\nSFTP 서버 연결 및 스캔 중... ({len(connections)}개 계정)", "cyan")
+  files, scan_errors = xf_postbox.scan(config, connections)
 
-  # Dry-run 모드
-  if args.dry_run:
-    save_estimate_csv(download_files_with_size)
-    return
+  if len(scan_errors) == len(connections):
+    echo("✗ 모든 계정의 SFTP 연결에 실패했습니다.", "red")
+    return 1
 
-  # 다운로드 시작 확인
-  if not Confirm.ask(f"[bold]{len(download_files)}개 파일을 다운로드하시겠습니까?[/bold]", default=True):
-    console.print("[yellow]다운로드를 취소했습니다.[/yellow]")
-    return
+  echo(f"\n파일 스캔 완료: 총 {len(files)}개 파일 발견\n", "bold green")
 
-  # 파일 다운로드
-  with Progress(
-      SpinnerColumn(),
-      TextColumn("[bold blue]{task.description}"),
-      BarColumn(complete_style="green", finished_style="bold green"),
-      DownloadColumn(),
-      TransferSpeedColumn(),
-      TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-      TimeRemainingColumn(),
-      console=console,
-      transient=False,
-      expand=True
-  ) as progress:
+  if not files:
+    echo("다운로드할 파일이 없습니다.", "yellow")
+    return 1 if scan_errors else 0
 
-    overall_task = progress.add_task(
-        f"[cyan]전체 진행률 (0/{len(download_files)} files)",
-        total=len(download_files)
-    )
-
-    def download_wrapper(file_dic):
-      if not shutdown_event.is_set():
-        download(file_dic, config, progress, overall_task)
-
-    thread_count = config['download'].get('thread_count')
-    if thread_count is None:
-      thread_count = max(1, os.cpu_count() - 1 if os.cpu_count() else 4)
+  # Dry-run 모드 - 실제 다운로드와 같이 로컬 경로가 겹치는 파일은 한 번만 집계
+  if args.dry_run:
+    files = xf_postbox.dedupe_files(config, files, connections)
+    print_estimate(files, xf_postbox.save_estimate_csv(files))
+    return 1 if scan_errors else 0
+
+  # 로컬 디렉토리 생성 및 이미 받은 파일 제외
+  pending, skipped = xf_postbox.plan(config, files, connections)
+  if skipped:
+    echo(f"✓ {len(skipped)}개 파일 이미 다운로드됨", "cyan")
+
+  if pending:
+    # 다운로드 시작 확인
+    if not (args.yes or args.headless):
+      from rich.prompt import Confirm
+
+      if not Confirm.ask(f"[bold]{len(pending)}개 파일을 다운로드하시겠습니까?[/bold]", default=True):
+        echo("다운로드를 취소했습니다.", "yellow")
+        return 0
+
+    bandwidth_limit = config['download'].get('bandwidth_limit')
+    if bandwidth_limit:
+      echo(f"전체 대역폭 제한: {bandwidth_limit} MB/s", "cyan")
+    echo(f"병렬 다운로드 스레드 수: {xf_postbox.get_thread_count(config)}\n", "cyan")
+
+    results = run_downloads(config, connections, pending)
+  else:
+    results = []
 
-    console.print(f"[cyan]병렬 다운로드 스레드 수: {thread_count}[/cyan]\n")
+  summary = xf_postbox.summarize(results, skipped)
+  print_report(connections, summary, scan_errors)
 
-    thread_pool = ThreadPool(thread_count)
+  if shutdown_event.is_set():
+    echo("\n⚠ 다운로드가 사용자에 의해 중단되었습니다.", "yellow")
+    return 1
 
-    try:
-      result = thread_pool.map_async(download_wrapper, download_files)
-      while not result.ready():
-        result.wait(0.1)
-        with progress_lock:
-          completed = progress.tasks[overall_task].completed
-          total = progress.tasks[overall_task].total
-          progress.update(
-              overall_task,
-              description=f"[cyan]전체 진행률 ({int(completed)}/{int(total)} files)"
-          )
-
-    except KeyboardInterrupt:
-      console.print("\n[yellow]⚠ 종료 중...[/yellow]")
-      shutdown_event.set()
-    finally:
-      thread_pool.close()
-      thread_pool.join(timeout=5)
-      console.print("[dim]스레드 정리 완료[/dim]")
+  failed = sum(counts['failed'] for counts in summary.values())
+  if failed or scan_errors:
+    echo(f"\n✗ 일부 다운로드 실패 (파일 {failed}개, 계정 {len(scan_errors)}개)", "red")
+    return 1
 
-  if shutdown_event.is_set():
-    console.print("\n[yellow]⚠ 다운로드가 사용자에 의해 중단되었습니다.[/yellow]")
-  else:
-    console.print("\n[bold green]✓ 모든 파일 다운로드 완료![/bold green]")
+  echo("\n✓ 모든 파일 다운로드 완료!", "bold green")
+  return 0
 
 
 if __name__ == "__main__":
-  main()
+  sys.exit(main())
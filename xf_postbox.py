@@ -0,0 +1,691 @@
+"""S&P Global Xpressfeed Downloader 라이브러리
+
+출력/입력 없이 결과를 반환하는 scan → plan → download 함수를 제공합니다.
+메시지는 logging('xf_postbox')으로 전달되며 작업 디렉토리를 변경하지 않습니다.
+
+  import xf_postbox
+
+  config = xf_postbox.load_config('config.yaml')
+  files, scan_errors = xf_postbox.scan(config)
+  pending, skipped = xf_postbox.plan(config, files)
+  results = xf_postbox.download_all(config, pending)
+"""
+import os
+import re
+import csv
+import time
+import logging
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
+from threading import Lock, Event
+
+log = logging.getLogger('xf_postbox')
+
+
+class ConfigError(Exception):
+  """설정 파일 오류"""
+
+
+def load_config(config_path='config.yaml'):
+  """설정 파일 로드"""
+  import yaml
+
+  try:
+    with open(config_path, 'r', encoding='utf-8') as f:
+      return yaml.safe_load(f)
+  except FileNotFoundError:
+    raise ConfigError(f"설정 파일을 찾을 수 없습니다: {config_path}")
+  except yaml.YAMLError as e:
+    raise ConfigError(f"설정 파일 파싱 오류: {e}")
+
+
+FILE_TYPES = ['full_files', 'change_files', 'flag_files', 'config_files']
+
+
+def _check_packages(packages, where):
+  """packages 설정 형식 확인 - products/xpressfeed는 패키지 이름 리스트"""
+  if packages is None:
+    return
+  if not isinstance(packages, dict):
+    raise ConfigError(f"config.yaml의 {where}는 products/xpressfeed 항목이어야 합니다")
+  for key in ['products', 'xpressfeed']:
+    if packages.get(key) is not None and not isinstance(packages[key], list):
+      raise ConfigError(f"config.yaml의 {where}.{key}는 리스트여야 합니다")
+
+
+def _check_download(config):
+  """download 설정 형식 확인"""
+  download = config.get('download')
+  if not isinstance(download, dict):
+    raise ConfigError("config.yaml에 필수 항목이 없습니다: 'download'")
+
+  file_types = download.get('file_types')
+  if not isinstance(file_types, dict):
+    raise ConfigError("config.yaml에 필수 항목이 없습니다: 'download.file_types'")
+  for key in FILE_TYPES:
+    if key not in file_types:
+      raise ConfigError(
+          f"config.yaml에 필수 항목이 없습니다: 'download.file_types.{key}'")
+
+  thread_count = download.get('thread_count')
+  if thread_count is not None and (
+          not isinstance(thread_count, int) or thread_count < 1):
+    raise ConfigError("config.yaml의 download.thread_count는 1 이상의 정수여야 합니다")
+
+  bandwidth_limit = download.get('bandwidth_limit')
+  if bandwidth_limit is not None and (
+          not isinstance(bandwidth_limit, (int, float)) or bandwidth_limit <= 0):
+    raise ConfigError("config.yaml의 download.bandwidth_limit는 0보다 큰 숫자여야 합니다")
+
+
+def get_connections(config):
+  """설정 형식 확인 및 연결 목록 생성 - connections(목록) 또는 connection(단일) 설정 지원
+
+  설정 형식이 올바르지 않으면 ConfigError를 발생시킵니다.
+  """
+  if not isinstance(config, dict):
+    raise ConfigError("설정 파일이 비어 있거나 형식이 올바르지 않습니다")
+
+  if config.get('connections'):
+    connections = config['connections']
+    if not isinstance(connections, list):
+      raise ConfigError("config.yaml의 connections는 리스트여야 합니다")
+  elif config.get('connection'):
+    connections = [config['connection']]
+  else:
+    raise ConfigError("config.yaml에 필수 항목이 없습니다: 'connections'")
+
+  _check_download(config)
+  _check_packages(config.get('packages'), 'packages')
+
+  directories = config.get('directories')
+  if directories is not None and not isinstance(directories, list):
+    raise ConfigError("config.yaml의 directories는 리스트여야 합니다")
+
+  result = []
+  names = set()
+  for conn in connections:
+    if not isinstance(conn, dict):
+      raise ConfigError(f"config.yaml의 connection 설정 형식이 올바르지 않습니다: {conn!r}")
+
+    try:
+      host = conn['host']
+      username = conn['username']
+      password = conn['password']
+      destination = conn['destination']
+    except KeyError as e:
+      raise ConfigError(f"config.yaml에 필수 항목이 없습니다: {e}")
+
+    if not all([host, username, password, destination]):
+      raise ConfigError(f"config.yaml의 connection 설정을 확인하세요 ({host})")
+
+    # 계정 이름 (리포트/진행률 표시용)
+    name = conn.get('name') or f"{username}@{host}"
+    if name in names:
+      raise ConfigError(f"config.yaml의 중복된 connection 이름: {name}")
+    names.add(name)
+
+    _check_packages(conn.get('packages'), f"{name}.packages")
+
+    result.append({
+        'name': name,
+        'host': host,
+        'username': username,
+        'password': password,
+        'destination': destination,
+        # 계정별 packages 항목이 없을 때만 전역 packages 사용
+        'packages': (conn['packages'] if 'packages' in conn
+                     else config.get('packages')) or {}
+    })
+  return result
+
+
+def connect(host, username, password):
+  """SFTP 연결 (타임아웃 설정)"""
+  from paramiko import Transport, SFTPClient
+
+  transport = Transport((host, 22))
+  transport.connect(username=username, password=password)
+  transport.set_keepalive(30)
+  sftp = SFTPClient.from_transport(transport)
+  sftp.get_channel().settimeout(30.0)
+  return sftp, transport
+
+
+def filter_full_files(full_files):
+  """최신 Full 파일들 필터링 - 같은 타임스탬프의 파일들만"""
+  if not full_files:
+    return []
+
+  full_files.sort()
+  last_full_file = full_files[-1]
+  m = re.search('[0-9]{8,}', last_full_file)
+  if not m:
+    return []
+
+  timestamp = m.group(0)
+  return list(filter(lambda t: timestamp in t, full_files))
+
+
+def filter_change_files(last_full_file, change_files):
+  """Full 파일 날짜 이후의 Change 파일들 필터링 - 날짜(앞 8자리) 기준"""
+  m = re.search('[0-9]{8,}', last_full_file)
+  if not m:
+    return []
+
+  timestamp = m.group(0)
+  cf_timestamps = []
+
+  for t in change_files:
+    m2 = re.search('[0-9]{' + str(len(timestamp)) + '}', t)
+    if m2:
+      cf_timestamps.append(m2.group(0))
+    else:
+      cf_timestamps.append("")
+
+  filter_lst = [t[:8] >= timestamp[:8] if len(
+      t) >= 8 else False for t in cf_timestamps]
+  return [change_files[i] for i in range(len(change_files)) if filter_lst[i]]
+
+
+def format_size(size_bytes):
+  """바이트를 읽기 쉬운 형식으로 변환"""
+  for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+    if size_bytes < 1024.0:
+      return f"{size_bytes:.2f} {unit}"
+    size_bytes /= 1024.0
+  return f"{size_bytes:.2f} PB"
+
+
+def save_estimate_csv(files, csv_filename=None):
+  """파일 정보를 CSV로 저장 - 저장된 파일 경로 반환"""
+  if csv_filename is None:
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    csv_filename = f'download_estimate_{timestamp}.csv'
+
+  total_size = sum([info['size_bytes'] or 0 for info in files])
+
+  with open(csv_filename, 'w', newline='', encoding='utf-8') as csvfile:
+    fieldnames = ['account', 'directory', 'package',
+                  'filename', 'size_bytes', 'size_readable']
+    writer = csv.DictWriter(csvfile, fieldnames=fieldnames,
+                            extrasaction='ignore')
+
+    writer.writeheader()
+    for file_info in files:
+      writer.writerow(file_info)
+
+    # 마지막에 총합 추가
+    writer.writerow({
+        'account': '',
+        'directory': '',
+        'package': '',
+        'filename': 'TOTAL',
+        'size_bytes': total_size,
+        'size_readable': format_size(total_size)
+    })
+
+  return csv_filename
+
+
+class BandwidthLimiter:
+  """모든 계정의 다운로드가 공유하는 대역폭 제한 (bytes/sec)"""
+
+  def __init__(self, bytes_per_sec):
+    self.bytes_per_sec = bytes_per_sec
+    self.lock = Lock()
+    self.next_time = time.monotonic()
+
+  def consume(self, nbytes):
+    """nbytes 전송 시간을 예약하고 필요한 만큼 대기"""
+    with self.lock:
+      now = time.monotonic()
+      start = max(now, self.next_time)
+      self.next_time = start + nbytes / self.bytes_per_sec
+      wait = self.next_time - now
+    if wait > 0:
+      time.sleep(wait)
+
+
+def _add_file(sftp, files, conn, top_dir, package, file_name):
+  """현재 원격 디렉토리의 파일을 크기와 함께 목록에 추가
+
+  크기 확인에 실패해도 목록에 남겨 두어 (size_bytes=None) 다운로드 단계에서
+  오류가 failed로 집계되도록 합니다.
+  """
+  try:
+    size = sftp.stat(file_name).st_size
+  except Exception as e:
+    log.warning(f"    ⚠ {file_name} 크기 확인 실패: {e}")
+    size = None
+  files.append({
+      'account': conn['name'],
+      'directory': top_dir,
+      'package': package,
+      'filename': file_name,
+      'size_bytes': size,
+      'size_readable': format_size(size) if size is not None else ''
+  })
+
+
+def scan_packages(sftp, top_dir, allowed_packages, config, conn):
+  """패키지 스캔 및 다운로드 파일 목록 생성"""
+  download_files = []
+  packages = sftp.listdir()
+
+  file_types = config['download']['file_types']
+
+  if allowed_packages is None:
+    allowed_packages = []
+
+  for package in packages:
+    if allowed_packages and package not in allowed_packages:
+      continue
+
+    sftp.chdir(package)
+    log.info(f'  → {conn["name"]}: {os.path.join(top_dir, package)}')
+
+    files = sftp.listdir()
+
+    # Feed Config 다운로드
+    if package == 'XpressfeedFeedConfigV2' and file_types['config_files']:
+      files.sort()
+      if files:
+        _add_file(sftp, download_files, conn, top_dir, package, files[-1])
+      sftp.chdir('..')
+      continue
+
+    # 설치 파일 다운로드
+    if package in ['V5Loader_Linux', 'V5Loader_Windows']:
+      for f in files:
+        _add_file(sftp, download_files, conn, top_dir, package, f)
+      sftp.chdir('..')
+      continue
+
+    # Full flag 파일
+    if file_types['flag_files']:
+      full_flags = [f for f in files if "Full" in f and f.endswith("flg")]
+      if full_flags:
+        full_flags.sort()
+        _add_file(sftp, download_files, conn, top_dir, package, full_flags[-1])
+      else:
+        log.info("    ⚠ Full flags 없음")
+
+    # Full 파일
+    valid_fulls = []
+    if file_types['full_files']:
+      full_files = [f for f in files if "Full" in f and f.endswith("zip")]
+      valid_fulls = filter_full_files(full_files)
+      if valid_fulls:
+        log.info(f"    → Full 파일 {len(valid_fulls)}개 발견")
+      for vf in valid_fulls:
+        _add_file(sftp, download_files, conn, top_dir, package, vf)
+
+    # Change 파일
+    if file_types['change_files'] and valid_fulls:
+      change_files = [f for f in files if "Change" in f and f.endswith("zip")]
+      if change_files:
+        valid_changes = filter_change_files(valid_fulls[-1], change_files)
+        if valid_changes:
+          log.info(f"    → Change 파일 {len(valid_changes)}개 발견")
+        for vc in valid_changes:
+          _add_file(sftp, download_files, conn, top_dir, package, vc)
+      else:
+        log.info("    ⚠ Change files 없음")
+
+    sftp.chdir('..')
+
+  return download_files
+
+
+def scan_xpressfeed_packages(sftp, top_dir, allowed_packages, config, conn):
+  """Xpressfeed 패키지 스캔"""
+  download_files = []
+  packages = sftp.listdir()
+
+  file_types = config['download']['file_types']
+
+  if allowed_packages is None:
+    allowed_packages = []
+
+  for package in packages:
+    if allowed_packages and package not in allowed_packages:
+      continue
+
+    sftp.chdir(package)
+    log.info(f'  → {conn["name"]}: {os.path.join(top_dir, package)}')
+
+    files = sftp.listdir()
+
+    if package in ['suppcxf']:
+      for lf in files:
+        _add_file(sftp, download_files, conn, top_dir, package, lf)
+      sftp.chdir('..')
+      continue
+
+    # Full flag 파일
+    if file_types['flag_files']:
+      full_flags = [f for f in files if f.startswith(
+          "f_") and f.endswith("flg")]
+      if full_flags:
+        full_flags.sort()
+        _add_file(sftp, download_files, conn, top_dir, package, full_flags[-1])
+      else:
+        log.info("    ⚠ Full flags 없음")
+
+    # Full 파일
+    valid_fulls = []
+    if file_types['full_files']:
+      full_files = [f for f in files if f.startswith(
+          "f_") and f.endswith("zip")]
+      valid_fulls = filter_full_files(full_files)
+      if valid_fulls:
+        log.info(f"    → Full 파일 {len(valid_fulls)}개 발견")
+      for vf in valid_fulls:
+        _add_file(sftp, download_files, conn, top_dir, package, vf)
+
+    # Change 파일
+    if file_types['change_files'] and valid_fulls:
+      change_files = [f for f in files if f.startswith("t_")]
+      if change_files:
+        valid_changes = filter_change_files(valid_fulls[-1], change_files)
+        if valid_changes:
+          log.info(f"    → Change 파일 {len(valid_changes)}개 발견")
+        for vc in valid_changes:
+          _add_file(sftp, download_files, conn, top_dir, package, vc)
+      else:
+        log.info("    ⚠ Change files 없음")
+
+    sftp.chdir('..')
+
+  return download_files
+
+
+def scan_connection(conn, config):
+  """계정 하나의 Products/Xpressfeed 스캔 - 별도 SFTP 연결 사용"""
+  sftp, transport = connect(conn['host'], conn['username'], conn['password'])
+  log.info(f"✓ SFTP 연결 성공 ({conn['name']})")
+
+  download_files = []
+
+  try:
+    # Products 디렉토리 스캔
+    if 'Products' in sftp.listdir('.'):
+      sftp.chdir('Products')
+      log.info(f"{conn['name']}: Products 디렉토리 스캔 중...")
+      products_files = scan_packages(
+          sftp, 'Products',
+          conn['packages'].get('products', []),
+          config,
+          conn
+      )
+      download_files.extend(products_files)
+      log.info(
+          f"→ {conn['name']}: Products에서 {len(products_files)}개 파일 발견")
+      sftp.chdir('..')
+
+    # Xpressfeed 디렉토리 스캔
+    if 'Xpressfeed' in sftp.listdir('.'):
+      sftp.chdir('Xpressfeed')
+      log.info(f"{conn['name']}: Xpressfeed 디렉토리 스캔 중...")
+      xpressfeed_files = scan_xpressfeed_packages(
+          sftp, 'Xpressfeed',
+          conn['packages'].get('xpressfeed', []),
+          config,
+          conn
+      )
+      download_files.extend(xpressfeed_files)
+      log.info(
+          f"→ {conn['name']}: Xpressfeed에서 {len(xpressfeed_files)}개 파일 발견")
+      sftp.chdir('..')
+  finally:
+    sftp.close()
+    transport.close()
+
+  return download_files
+
+
+def scan(config, connections=None):
+  """모든 계정 동시 스캔 - (파일 목록, 계정별 스캔 오류) 반환"""
+  if connections is None:
+    connections = get_connections(config)
+
+  def scan_wrapper(conn):
+    try:
+      return conn, scan_connection(conn, config), None
+    except Exception as e:
+      return conn, None, e
+
+  scan_pool = ThreadPool(len(connections))
+  try:
+    scan_results = scan_pool.map(scan_wrapper, connections)
+  finally:
+    scan_pool.close()
+    scan_pool.join()
+
+  download_files = []
+  scan_errors = {}
+  for conn, scanned, error in scan_results:
+    if error is not None:
+      log.error(f"✗ {conn['name']}: SFTP 스캔 실패: {error}")
+      scan_errors[conn['name']] = error
+      continue
+    download_files.extend(scanned)
+
+  return download_files, scan_errors
+
+
+def local_path(destination, file_info):
+  """파일의 로컬 저장 경로 (절대 경로)"""
+  return os.path.abspath(os.path.join(
+      destination, file_info['directory'], file_info['package'],
+      file_info['filename']))
+
+
+def dedupe_files(config, files, connections=None):
+  """같은 로컬 경로로 저장될 파일 제거 - 처음 나온 계정의 항목만 유지
+
+  여러 계정이 같은 destination을 쓰면 공통 패키지(V5Loader_*,
+  XpressfeedFeedConfigV2 등)가 계정 수만큼 스캔되므로 한 번만 남깁니다.
+  """
+  if connections is None:
+    connections = get_connections(config)
+  destinations = {conn['name']: conn['destination'] for conn in connections}
+
+  result = []
+  local_paths = set()
+  for file_info in files:
+    f = local_path(destinations[file_info['account']], file_info)
+    if f in local_paths:
+      continue
+    local_paths.add(f)
+    result.append(file_info)
+  return result
+
+
+def plan(config, files, connections=None):
+  """로컬 디렉토리 생성 및 다운로드 대상 선정 - (다운로드 목록, 건너뛸 목록) 반환
+
+  로컬 파일 크기가 원격과 같으면 SFTP 연결 없이 건너뜁니다.
+  여러 계정이 같은 destination을 쓰는 경우 같은 로컬 파일은 한 번만 다운로드합니다.
+  """
+  if connections is None:
+    connections = get_connections(config)
+  destinations = {conn['name']: conn['destination'] for conn in connections}
+
+  for destination in destinations.values():
+    if not os.path.exists(destination):
+      os.makedirs(destination)
+      log.info(f"대상 디렉토리 생성: {destination}")
+
+    for dir_name in config.get('directories') or []:
+      p = os.path.join(destination, dir_name)
+      if not os.path.exists(p):
+        os.mkdir(p)
+        log.info(f"하위 디렉토리 생성: {p}")
+
+  pending = []
+  skipped = []
+  for file_info in dedupe_files(config, files, connections):
+    f = local_path(destinations[file_info['account']], file_info)
+    os.makedirs(os.path.dirname(f), exist_ok=True)
+
+    # 크기를 모르는 파일은 항상 다운로드 대상
+    if (file_info['size_bytes'] is not None and os.path.isfile(f)
+            and file_info['size_bytes'] == os.path.getsize(f)):
+      skipped.append(file_info)
+    else:
+      pending.append(file_info)
+
+  return pending, skipped
+
+
+READ_BLOCK_SIZE = 32768  # paramiko SFTP 최대 read 요청 크기
+
+
+def _read_throttled(sftp, file_name, ff, limiter, callback, total):
+  """대역폭 제한 다운로드 - read 요청을 보내기 전에 limiter에서 대기
+
+  getfo의 prefetch는 요청을 미리 보내 데이터를 메모리에 쌓으므로 사용하지 않고,
+  블록 단위 read 루프로 네트워크 전송 자체를 제한합니다.
+  """
+  transferred = 0
+  with sftp.open(file_name, 'rb') as rf:
+    while True:
+      limiter.consume(READ_BLOCK_SIZE)
+      data = rf.read(READ_BLOCK_SIZE)
+      if not data:
+        break
+      ff.write(data)
+      transferred += len(data)
+      callback(transferred, total)
+
+
+def download(file_info, conn, limiter=None, stop_event=None, on_progress=None):
+  """파일 다운로드 - 결과 상태 반환 (downloaded/interrupted/failed)"""
+  if stop_event is not None and stop_event.is_set():
+    return 'interrupted'
+
+  sftp = None
+  transport = None
+  file_name = file_info['filename']
+
+  try:
+    sftp, transport = connect(conn['host'], conn['username'], conn['password'])
+
+    sftp.chdir(file_info['directory'])
+    sftp.chdir(file_info['package'])
+
+    f = os.path.join(conn['destination'], file_info['directory'],
+                     file_info['package'], file_name)
+
+    with open(f, 'wb') as ff:
+      def _callback(transferred, total):
+        if stop_event is not None and stop_event.is_set():
+          raise KeyboardInterrupt("Download interrupted by user")
+
+        if on_progress:
+          on_progress(file_info, transferred, total)
+
+      if limiter:
+        _read_throttled(sftp, file_name, ff, limiter, _callback,
+                        file_info['size_bytes'])
+      else:
+        sftp.getfo(file_name, ff, callback=_callback)
+
+    log.info(f"✓ {conn['name']}: {file_name} 다운로드 완료")
+    return 'downloaded'
+
+  except KeyboardInterrupt:
+    log.warning(f"⚠ {conn['name']}: {file_name} 다운로드 중단됨")
+    return 'interrupted'
+
+  except Exception as e:
+    log.error(f"✗ 오류 발생 ({conn['name']}: {file_name}): {e}")
+    return 'failed'
+
+  finally:
+    try:
+      if sftp:
+        sftp.close()
+      if transport:
+        transport.close()
+    except:
+      pass
+
+
+def get_thread_count(config):
+  """동시 다운로드 스레드 수 (null이면 CPU 코어 수 - 1)"""
+  thread_count = config['download'].get('thread_count')
+  if thread_count is None:
+    thread_count = max(1, os.cpu_count() - 1 if os.cpu_count() else 4)
+  return thread_count
+
+
+def interleave_accounts(files):
+  """계정별 파일을 번갈아 배치 - 한 계정의 파일이 큐 앞부분을 독점하지 않도록"""
+  by_account = {}
+  for file_info in files:
+    by_account.setdefault(file_info['account'], []).append(file_info)
+
+  result = []
+  queues = list(by_account.values())
+  for i in range(max((len(q) for q in queues), default=0)):
+    result.extend(q[i] for q in queues if i < len(q))
+  return result
+
+
+def download_all(config, files, connections=None, stop_event=None,
+                 on_start=None, on_progress=None, on_done=None):
+  """모든 계정의 파일을 하나의 스레드 풀에서 다운로드 - 상태가 추가된 파일 목록 반환
+
+  thread_count와 bandwidth_limit(MB/s)은 모든 계정이 공유합니다.
+  파일은 계정별로 번갈아 한 개씩 스레드에 배분되며, 결과는 완료 순서로 반환됩니다.
+  """
+  if connections is None:
+    connections = get_connections(config)
+  conns = {conn['name']: conn for conn in connections}
+
+  if stop_event is None:
+    stop_event = Event()
+
+  # 전체 계정 공유 대역폭 제한 (MB/s)
+  limiter = None
+  bandwidth_limit = config['download'].get('bandwidth_limit')
+  if bandwidth_limit:
+    limiter = BandwidthLimiter(bandwidth_limit * 1024 * 1024)
+
+  thread_count = get_thread_count(config)
+
+  def download_wrapper(file_info):
+    if on_start and not stop_event.is_set():
+      on_start(file_info)
+    status = download(file_info, conns[file_info['account']],
+                      limiter, stop_event, on_progress)
+    if on_done:
+      on_done(file_info, status)
+    return dict(file_info, status=status)
+
+  thread_pool = ThreadPool(thread_count)
+
+  try:
+    # chunksize=1 - 큰 파일 묶음이 한 스레드에 몰리지 않도록 한 개씩 배분
+    return list(thread_pool.imap_unordered(
+        download_wrapper, interleave_accounts(files), chunksize=1))
+
+  except KeyboardInterrupt:
+    stop_event.set()
+    raise
+  finally:
+    thread_pool.close()
+    thread_pool.join()
+
+
+def summarize(results, skipped=()):
+  """계정별 상태 개수 집계 - {account: {status: count}}"""
+  summary = {}
+  for file_info in list(results) + [dict(f, status='skipped') for f in skipped]:
+    counts = summary.setdefault(file_info['account'], {
+        'downloaded': 0, 'skipped': 0, 'interrupted': 0, 'failed': 0})
+    counts[file_info['status']] += 1
+  return summary